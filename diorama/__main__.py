@@ -1,6 +1,9 @@
+from argparse import ArgumentParser
+from os import environ
+from signal import SIGTERM, signal
 from sys import exit as sysexit
 
-from download import download_archive
+from download import ARCHIVE_URL, download_archive
 from unzip import unzip
 from consts import pprint, Status
 from loops import do_loop
@@ -27,5 +30,43 @@ def main():
         pprint.print(Status.INFO, f'Time elapsed: {convert_float_to_time(end - start)}')
         sysexit(1)
 
+def watch(source: str, interval: float, health_port: int | None = None):
+    """
+    Run the scraper as a daemon that refreshes the output files on an interval
+    :param source: HTTP(S) URL, file:// URL, or local path of the archive
+    :type source: str
+    :param interval: Seconds between the start of two polls
+    :type interval: float
+    :param health_port: Port to serve health statistics on, if any
+    :type health_port: int | None
+    """
+    from daemon import Daemon
+
+    daemon = Daemon(source=source)
+    # let the current poll finish moving its files in place before exiting
+    signal(SIGTERM, lambda *_: daemon.stop())
+    server = None
+    if health_port is not None:
+        server = daemon.serve_health(health_port)
+        pprint.print(Status.INFO, f'Serving health statistics on port {server.server_port}')
+    try:
+        daemon.run(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pprint.print(Status.INFO, 'Stopping watch mode')
+        if server is not None:
+            server.shutdown()
+    sysexit(0)
+
 if __name__ == '__main__':
-    main()
+    parser = ArgumentParser(prog='diorama', description='Diorama scraper for AniDB')
+    parser.add_argument('--watch', action='store_true', help='poll the archive and refresh the output files on an interval')
+    parser.add_argument('--interval', type=float, default=float(environ.get('DIORAMA_INTERVAL', '3600')), help='seconds between polls in watch mode')
+    parser.add_argument('--source', default=environ.get('DIORAMA_SOURCE', ARCHIVE_URL), help='URL or local path of Anime_HTTP.zip in watch mode')
+    parser.add_argument('--health-port', type=int, default=None, help='serve health statistics as JSON on this port in watch mode')
+    args = parser.parse_args()
+    if args.watch:
+        watch(args.source, args.interval, args.health_port)
+    else:
+        main()
@@ -0,0 +1,300 @@
+"""Columnar NumPy export of numeric fields for vectorized analytics"""
+
+import os
+from dataclasses import fields
+from typing import Any
+
+import numpy as np
+from librensetsu.models import RelationMaps
+
+SITES: list[str] = [f.name for f in fields(RelationMaps)]
+"""RelationMaps sites, each exported as a nullable ID column"""
+
+_DATES = ("start_date", "end_date")
+_DATE_PARTS = ("year", "month", "day")
+_COUNTS = ("unit_counts", "subunit_counts", "subunit_order")
+_CATEGORIES = ("media_sub_type", "season")
+
+
+def _nullable(values: list[Any], dtype: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert values with Nones to an array and a missing-value mask
+    :param values: Values, None if missing
+    :type values: list[Any]
+    :param dtype: NumPy dtype of the array
+    :type dtype: str
+    :return: Array with missing values zeroed, and mask that is True if missing
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    mask = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+    filler = "" if np.dtype(dtype).kind == "U" else 0
+    array = np.array([filler if v is None else v for v in values], dtype=dtype)
+    return array, mask
+
+
+def _categorical(values: list[str | None]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert strings to categorical codes
+    :param values: Values, None if missing
+    :type values: list[str | None]
+    :return: Codes, -1 if missing, and sorted categories
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    categories = sorted({v for v in values if v is not None})
+    lookup = {c: i for i, c in enumerate(categories)}
+    codes = np.array([lookup.get(v, -1) for v in values], dtype=np.int16)
+    return codes, np.array(categories, dtype=str)
+
+
+def _mapping_id(value: Any) -> int | str | None:
+    """
+    Get the ID of a RelationMaps value, unwrapping ConventionalMapping
+    :param value: Mapping value
+    :type value: Any
+    :return: ID, if any
+    :rtype: int | str | None
+    """
+    if isinstance(value, dict):
+        value = value.get("id")
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return value
+
+
+def _mapping_type(value: Any) -> str | None:
+    """
+    Get the media type of a ConventionalMapping value
+    :param value: Mapping value
+    :type value: Any
+    :return: Media type, if any
+    :rtype: str | None
+    """
+    if isinstance(value, dict) and value.get("media_type") is not None:
+        return str(value["media_type"])
+    return None
+
+
+def build_columns(records: list[dict[str, Any]]) -> dict[str, np.ndarray]:
+    """
+    Build typed columns from converted records
+    :param records: MediaInfo objects converted to dict
+    :type records: list[dict[str, Any]]
+    :return: Column name mapped to its array; nullable columns get a
+        "<name>_mask" array, categorical ones a "<name>_categories" array,
+        and sites with typed IDs a categorical "map_<site>_type" column
+    :rtype: dict[str, np.ndarray]
+    """
+    columns: dict[str, np.ndarray] = {
+        "anidb": np.array([int(r["mappings"]["anidb"]) for r in records], dtype=np.int64),
+    }
+    for key in _DATES:
+        prefix = key.split("_")[0]
+        for part in _DATE_PARTS:
+            values = [(r.get(key) or {}).get(part) for r in records]
+            columns[f"{prefix}_{part}"], columns[f"{prefix}_{part}_mask"] = _nullable(values, "int16")
+    for key in _COUNTS:
+        columns[key], columns[f"{key}_mask"] = _nullable([r.get(key) for r in records], "int32")
+    for key in _CATEGORIES:
+        columns[key], columns[f"{key}_categories"] = _categorical([r.get(key) for r in records])
+    for site in SITES:
+        if site == "anidb":
+            continue
+        values = [_mapping_id((r.get("mappings") or {}).get(site)) for r in records]
+        present = [v for v in values if v is not None]
+        numeric = all(isinstance(v, int) and not isinstance(v, bool) for v in present)
+        dtype = "int64" if numeric else "U"
+        if not numeric:
+            values = [None if v is None else str(v) for v in values]
+        columns[f"map_{site}"], columns[f"map_{site}_mask"] = _nullable(values, dtype)
+        # IDs of ConventionalMapping sites such as TMDB are only unique per media type
+        types = [_mapping_type((r.get("mappings") or {}).get(site)) for r in records]
+        if any(t is not None for t in types):
+            columns[f"map_{site}_type"], columns[f"map_{site}_type_categories"] = _categorical(types)
+    return columns
+
+
+def write_columns(records: list[dict[str, Any]], path: str) -> dict[str, np.ndarray]:
+    """
+    Write typed columns of converted records to an .npz file
+    :param records: MediaInfo objects converted to dict
+    :type records: list[dict[str, Any]]
+    :param path: Path to the .npz file
+    :type path: str
+    :return: Written columns
+    :rtype: dict[str, np.ndarray]
+    """
+    columns = build_columns(records)
+    # write next to the target and move in place, so readers never see a partial file
+    try:
+        with open(path + ".tmp", "wb") as f:
+            np.savez_compressed(f, **columns)
+        os.replace(path + ".tmp", path)
+    except BaseException:
+        try:
+            os.remove(path + ".tmp")
+        except FileNotFoundError:
+            pass
+        raise
+    return columns
+
+
+class Columns:
+    """Loaded columnar export"""
+
+    def __init__(self, columns: dict[str, np.ndarray]):
+        """
+        Columns class constructor
+        :param columns: Columns, as returned by build_columns
+        :type columns: dict[str, np.ndarray]
+        """
+        self._columns = columns
+
+    @classmethod
+    def load(cls, path: str) -> "Columns":
+        """
+        Load a columnar export from an .npz file
+        :param path: Path to the .npz file
+        :type path: str
+        :return: Columns object
+        :rtype: Columns
+        """
+        with np.load(path, allow_pickle=False) as npz:
+            return cls({k: npz[k] for k in npz.files})
+
+    def __len__(self) -> int:
+        return len(self._columns["anidb"])
+
+    @property
+    def names(self) -> list[str]:
+        """
+        Get column names, without masks and category tables
+        :return: Column names
+        :rtype: list[str]
+        """
+        return [
+            k for k in self._columns
+            if not k.endswith("_mask") and not k.endswith("_categories")
+        ]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """
+        Get a column, nullable ones as masked arrays
+        :param name: Column name
+        :type name: str
+        :return: Column
+        :rtype: np.ndarray
+        """
+        data = self._columns[name]
+        mask = self._columns.get(f"{name}_mask")
+        if mask is not None:
+            return np.ma.MaskedArray(data, mask=mask)
+        return data
+
+    def raw(self, name: str) -> np.ndarray:
+        """
+        Get the plain array of a column, missing values zeroed
+        :param name: Column name
+        :type name: str
+        :return: Column data, codes for categorical columns
+        :rtype: np.ndarray
+        """
+        return self._columns[name]
+
+    def mask(self, name: str) -> np.ndarray:
+        """
+        Get the missing-value mask of a column
+        :param name: Column name
+        :type name: str
+        :return: Mask, True where the value is missing
+        :rtype: np.ndarray
+        """
+        mask = self._columns.get(f"{name}_mask")
+        if mask is not None:
+            return mask
+        if self.is_categorical(name):
+            return self._columns[name] < 0
+        return np.zeros(len(self._columns[name]), dtype=bool)
+
+    def is_categorical(self, name: str) -> bool:
+        """
+        Check whether a column holds categorical codes
+        :param name: Column name
+        :type name: str
+        :return: Whether the column is categorical
+        :rtype: bool
+        """
+        return f"{name}_categories" in self._columns
+
+    def categories(self, name: str) -> np.ndarray:
+        """
+        Get the categories of a categorical column
+        :param name: Column name
+        :type name: str
+        :return: Categories, indexed by code
+        :rtype: np.ndarray
+        """
+        return self._columns[f"{name}_categories"]
+
+    def decode(self, name: str) -> np.ndarray:
+        """
+        Get a categorical column as strings
+        :param name: Column name
+        :type name: str
+        :return: Values, empty string if missing
+        :rtype: np.ndarray
+        """
+        codes = self._columns[name]
+        table = np.append(self.categories(name), "")
+        return table[np.where(codes < 0, len(table) - 1, codes)]
+
+
+def episodes_per_year(cols: Columns) -> dict[int, int]:
+    """
+    Sum episodes by start year
+    :param cols: Columnar export
+    :type cols: Columns
+    :return: Start year mapped to its total episodes
+    :rtype: dict[int, int]
+    """
+    valid = ~cols.mask("start_year") & ~cols.mask("unit_counts")
+    years = cols.raw("start_year")[valid]
+    counts = cols.raw("unit_counts")[valid].astype(np.int64)
+    uniq, inverse = np.unique(years, return_inverse=True)
+    totals = np.bincount(inverse, weights=counts, minlength=len(uniq))
+    return {int(y): int(t) for y, t in zip(uniq, totals)}
+
+
+def minutes_per_season(cols: Columns) -> dict[tuple[int, str], int]:
+    """
+    Sum minutes by start year and season
+    :param cols: Columnar export
+    :type cols: Columns
+    :return: (year, season) mapped to its total minutes
+    :rtype: dict[tuple[int, str], int]
+    """
+    valid = ~cols.mask("season") & ~cols.mask("start_year") & ~cols.mask("subunit_counts")
+    categories = cols.categories("season")
+    keys = cols.raw("start_year")[valid].astype(np.int64) * len(categories) + cols.raw("season")[valid]
+    minutes = cols.raw("subunit_counts")[valid].astype(np.int64)
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=minutes, minlength=len(uniq))
+    return {
+        (int(k // len(categories)), str(categories[k % len(categories)])): int(t)
+        for k, t in zip(uniq, totals)
+    }
+
+
+def mapping_coverage(cols: Columns) -> dict[str, float]:
+    """
+    Get the share of anime mapped to every site
+    :param cols: Columnar export
+    :type cols: Columns
+    :return: Site mapped to its coverage, from 0 to 1
+    :rtype: dict[str, float]
+    """
+    total = len(cols)
+    return {
+        name[len("map_"):]: float((~cols.mask(name)).sum() / total) if total else 0.0
+        for name in cols.names
+        if name.startswith("map_") and not cols.is_categorical(name)
+    }
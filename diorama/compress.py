@@ -0,0 +1,309 @@
+"""Write JSON artifacts while streaming them into compressed variants"""
+
+import bz2
+import json
+import lzma
+import os
+import zlib
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Protocol
+
+from consts import pprint, Status, COMPRESS_EXTENSIONS
+
+
+class _Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+    def flush(self) -> bytes: ...
+
+
+def _gzip(level: int) -> _Compressor:
+    # wbits=31 makes zlib emit a gzip header and trailer, so the result is
+    # readable by gzip.open() without going through the slower gzip module
+    return zlib.compressobj(min(max(level, 0), 9), zlib.DEFLATED, 31)
+
+
+def _lzma(level: int) -> _Compressor:
+    return lzma.LZMACompressor(format=lzma.FORMAT_XZ, preset=min(max(level, 0), 9))
+
+
+def _bz2(level: int) -> _Compressor:
+    return bz2.BZ2Compressor(min(max(level, 1), 9))
+
+
+CODECS: dict[str, tuple[str, Any]] = {
+    "gzip": (COMPRESS_EXTENSIONS["gzip"], _gzip),
+    "lzma": (COMPRESS_EXTENSIONS["lzma"], _lzma),
+    "bz2": (COMPRESS_EXTENSIONS["bz2"], _bz2),
+}
+"""Supported codecs, mapped to their file extension and compressor factory"""
+
+
+@dataclass
+class CodecStats:
+    """Statistics of a single compressed artifact"""
+    codec: str
+    path: str
+    bytes_in: int = 0
+    bytes_out: int = 0
+    seconds: float = 0.0
+
+    @property
+    def ratio(self) -> float:
+        """
+        Get compression ratio, compressed size over plain size
+        :return: Compression ratio
+        :rtype: float
+        """
+        return self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """
+        Get compression throughput in MiB of plain input per second
+        :return: Throughput in MiB/s
+        :rtype: float
+        """
+        return self.bytes_in / 1048576 / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class ArtifactStats:
+    """Statistics of a plain artifact and its compressed variants"""
+    path: str
+    bytes_written: int = 0
+    seconds: float = 0.0
+    codecs: list[CodecStats] = field(default_factory=list)
+
+
+CHUNK_SIZE = 1 << 20
+"""Bytes handed to the plain file and to each compressor per call"""
+
+
+class TeeWriter:
+    """
+    Byte sink that writes to a plain file and to compressors
+
+    Every file is written under a ".tmp" suffix and moved in place on close,
+    so readers never see a partially written artifact
+    """
+
+    def __init__(
+        self,
+        path: str,
+        codecs: list[str] | tuple[str, ...] = (),
+        level: int = 6,
+    ):
+        """
+        TeeWriter class constructor
+        :param path: Path to the plain output file
+        :type path: str
+        :param codecs: Codec names from CODECS to tee the output into
+        :type codecs: list[str] | tuple[str, ...]
+        :param level: Compression level, clamped to what each codec accepts
+        :type level: int
+        """
+        unknown = [c for c in codecs if c not in CODECS]
+        if unknown:
+            raise ValueError(f"Unknown compression codec(s): {', '.join(unknown)}")
+        self.stats = ArtifactStats(path=path)
+        self._futures: list[Future] = []
+        self._plain = open(path + ".tmp", "wb")
+        self._sinks = []
+        for codec in codecs:
+            ext, factory = CODECS[codec]
+            self._sinks.append((
+                factory(level),
+                open(path + ext + ".tmp", "wb"),
+                CodecStats(codec=codec, path=path + ext),
+            ))
+            self.stats.codecs.append(self._sinks[-1][2])
+
+    @staticmethod
+    def _compress(data: bytes, compressor: _Compressor, handle: Any, stats: CodecStats) -> None:
+        """Feed data to a single compressor in CHUNK_SIZE slices"""
+        start = perf_counter()
+        view = memoryview(data)
+        for i in range(0, len(view), CHUNK_SIZE):
+            chunk = compressor.compress(view[i:i + CHUNK_SIZE])
+            handle.write(chunk)
+            stats.bytes_out += len(chunk)
+        stats.bytes_in += len(data)
+        stats.seconds += perf_counter() - start
+
+    def write(self, data: bytes, pool: Executor | None = None) -> int:
+        """
+        Write bytes to the plain file and every compressor
+        :param data: Bytes to write, ideally the whole serialized artifact
+        :type data: bytes
+        :param pool: Executor to run each compressor in, they are then only
+            waited for on close
+        :type pool: Executor | None
+        :return: Number of bytes written
+        :rtype: int
+        """
+        for compressor, handle, stats in self._sinks:
+            if pool is None:
+                self._compress(data, compressor, handle, stats)
+            else:
+                self._futures.append(pool.submit(self._compress, data, compressor, handle, stats))
+        start = perf_counter()
+        view = memoryview(data)
+        for i in range(0, len(view), CHUNK_SIZE):
+            self._plain.write(view[i:i + CHUNK_SIZE])
+        self.stats.seconds += perf_counter() - start
+        self.stats.bytes_written += len(data)
+        return len(data)
+
+    def _wait(self) -> None:
+        """Wait for compressors running in an executor, raising their errors"""
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        """Flush every compressor, close every file, and move them in place"""
+        self._wait()
+        self._plain.close()
+        for compressor, handle, stats in self._sinks:
+            start = perf_counter()
+            chunk = compressor.flush()
+            handle.write(chunk)
+            stats.seconds += perf_counter() - start
+            stats.bytes_out += len(chunk)
+            handle.close()
+        os.replace(self.stats.path + ".tmp", self.stats.path)
+        for _, _, stats in self._sinks:
+            os.replace(stats.path + ".tmp", stats.path)
+
+    def abort(self) -> None:
+        """Close and remove every temporary file, keeping the previous artifacts"""
+        for future in self._futures:
+            future.cancel()
+        wait(self._futures)
+        self._futures = []
+        for handle, path in [(self._plain, self.stats.path)] + [
+            (handle, stats.path) for _, handle, stats in self._sinks
+        ]:
+            handle.close()
+            try:
+                os.remove(path + ".tmp")
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> "TeeWriter":
+        return self
+
+    def __exit__(self, exc_type, *_) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _remove_stale(path: str, codecs: list[str] | tuple[str, ...]) -> None:
+    """Remove variants of codecs that are no longer configured"""
+    for codec, (ext, _) in CODECS.items():
+        if codec not in codecs:
+            try:
+                os.remove(path + ext)
+            except FileNotFoundError:
+                pass
+
+
+def serialize(data: Any) -> bytes:
+    """
+    Serialize data to UTF-8 JSON with the C encoder in a single call
+    :param data: JSON-serializable data
+    :type data: Any
+    :return: Serialized data
+    :rtype: bytes
+    """
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def dump_json(
+    data: Any,
+    path: str,
+    codecs: list[str] | tuple[str, ...] = (),
+    level: int = 6,
+) -> ArtifactStats:
+    """
+    Dump data as JSON to a file and its compressed variants, serializing it
+    once, and remove variants of codecs that are no longer configured
+    :param data: JSON-serializable data
+    :type data: Any
+    :param path: Path to the plain output file
+    :type path: str
+    :param codecs: Codec names from CODECS to tee the output into
+    :type codecs: list[str] | tuple[str, ...]
+    :param level: Compression level
+    :type level: int
+    :return: Statistics of the written artifact
+    :rtype: ArtifactStats
+    """
+    return dump_many({path: data}, codecs, level)[0]
+
+
+def dump_many(
+    artifacts: dict[str, Any],
+    codecs: list[str] | tuple[str, ...] = (),
+    level: int = 6,
+    threaded: bool = False,
+) -> list[ArtifactStats]:
+    """
+    Dump several JSON artifacts, optionally compressing them in parallel
+    :param artifacts: Output path mapped to the data to write there
+    :type artifacts: dict[str, Any]
+    :param codecs: Codec names from CODECS to tee the output into
+    :type codecs: list[str] | tuple[str, ...]
+    :param level: Compression level
+    :type level: int
+    :param threaded: Run every codec of every artifact as its own task in a
+        thread pool; zlib, lzma, and bz2 release the GIL while compressing,
+        while serialization stays on the calling thread
+    :type threaded: bool
+    :return: Statistics of every written artifact, in input order
+    :rtype: list[ArtifactStats]
+    """
+    pool = None
+    if threaded and codecs:
+        pool = ThreadPoolExecutor(max_workers=min(len(artifacts) * len(codecs), os.cpu_count() or 1))
+    writers: list[TeeWriter] = []
+    try:
+        for path, data in artifacts.items():
+            payload = serialize(data)
+            writers.append(TeeWriter(path, codecs, level))
+            writers[-1].write(payload, pool)
+        for writer in writers:
+            writer.close()
+    except BaseException:
+        for writer in writers:
+            writer.abort()
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    for path in artifacts:
+        _remove_stale(path, codecs)
+    return [writer.stats for writer in writers]
+
+
+def report(stats: list[ArtifactStats]) -> None:
+    """
+    Print size, ratio, and throughput of written artifacts
+    :param stats: Statistics returned by dump_json or dump_many
+    :type stats: list[ArtifactStats]
+    """
+    for artifact in stats:
+        pprint.print(
+            Status.INFO,
+            f"Wrote {artifact.path}: {artifact.bytes_written / 1048576:.2f} MiB",
+        )
+        for codec in artifact.codecs:
+            pprint.print(
+                Status.INFO,
+                f"Wrote {codec.path}: {codec.bytes_out / 1048576:.2f} MiB, "
+                f"ratio {codec.ratio:.3f}, {codec.throughput:.2f} MiB/s",
+            )
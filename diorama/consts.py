@@ -1,5 +1,44 @@
+from os import environ
+
 from librensetsu.prettyprint import PrettyPrint, Platform, Status
 
 pprint = PrettyPrint(Platform.ANIDB)
 
-__all__ = ['pprint', 'Platform', 'Status']
\ No newline at end of file
+COMPRESS_EXTENSIONS: dict[str, str] = {
+    "gzip": ".gz",
+    "lzma": ".xz",
+    "bz2": ".bz2",
+}
+"""Supported compression codecs, mapped to their file extension"""
+COMPRESS_CODECS: list[str] = [
+    codec.strip()
+    for codec in environ.get("DIORAMA_COMPRESS", "gzip").split(",")
+    if codec.strip()
+]
+"""Codecs to tee JSON artifacts into, comma-separated in DIORAMA_COMPRESS"""
+# fail before downloading and converting anything, not when writing the output
+if _unknown := [c for c in COMPRESS_CODECS if c not in COMPRESS_EXTENSIONS]:
+    raise ValueError(
+        f"Unknown codec(s) in DIORAMA_COMPRESS: {', '.join(_unknown)}, "
+        f"expected any of {', '.join(COMPRESS_EXTENSIONS)}"
+    )
+COMPRESS_LEVEL: int = int(environ.get("DIORAMA_COMPRESS_LEVEL", "9"))
+"""Compression level, clamped to the range each codec accepts"""
+COMPRESS_THREADED: bool = environ.get("DIORAMA_COMPRESS_THREADED", "0") not in ("", "0", "false")
+"""Whether to run every codec of every artifact as its own thread pool task"""
+BUILD_INDEX: bool = environ.get("DIORAMA_INDEX", "0") not in ("", "0", "false")
+"""Whether to write the inverted tag and title index to anidb_index.json"""
+BUILD_COLUMNS: bool = environ.get("DIORAMA_COLUMNS", "0") not in ("", "0", "false")
+"""Whether to write numeric fields as NumPy columns to anidb.npz"""
+
+__all__ = [
+    'pprint',
+    'Platform',
+    'Status',
+    'COMPRESS_EXTENSIONS',
+    'COMPRESS_CODECS',
+    'COMPRESS_LEVEL',
+    'COMPRESS_THREADED',
+    'BUILD_INDEX',
+    'BUILD_COLUMNS',
+]
@@ -0,0 +1,271 @@
+"""Long-running watch mode that keeps parsed state warm between refreshes"""
+
+import json
+import re
+import zipfile
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Thread
+from time import perf_counter, time
+from typing import Any
+
+from consts import pprint, Status, BUILD_INDEX, BUILD_COLUMNS, COMPRESS_LEVEL, COMPRESS_THREADED
+from download import ARCHIVE_URL, fetch_archive
+from index import IndexBuilder
+from loops import process_xml, write_outputs
+
+_DOC_RE = re.compile(r"AnimeDoc_(\d+)\.xml$")
+
+
+@dataclass
+class DaemonStats:
+    """Health and timing statistics of a Daemon"""
+    started: float
+    polls: int = 0
+    refreshes: int = 0
+    errors: int = 0
+    records: int = 0
+    last_poll: float | None = None
+    last_refresh: float | None = None
+    last_error: str | None = None
+    last_poll_seconds: float = 0.0
+    last_convert_seconds: float = 0.0
+    last_write_seconds: float = 0.0
+    last_changed_docs: int = 0
+    last_removed_docs: int = 0
+    last_failed_docs: list[int] = field(default_factory=list)
+
+
+class Daemon:
+    """Poll the archive source and re-convert only changed AnimeDocs"""
+
+    def __init__(
+        self,
+        source: str = ARCHIVE_URL,
+        archive: str = "Anime_HTTP.zip",
+        build_index: bool = BUILD_INDEX,
+        build_columns: bool = BUILD_COLUMNS,
+        codecs: list[str] | None = None,
+        level: int = COMPRESS_LEVEL,
+        threaded: bool = COMPRESS_THREADED,
+    ):
+        """
+        Daemon class constructor
+        :param source: HTTP(S) URL, file:// URL, or local path of the archive
+        :type source: str
+        :param archive: Path to keep the fetched archive at
+        :type archive: str
+        :param build_index: Write the inverted tag and title index to anidb_index.json
+        :type build_index: bool
+        :param build_columns: Write numeric fields as NumPy columns to anidb.npz
+        :type build_columns: bool
+        :param codecs: Codecs to compress the JSON artifacts with while writing,
+            defaults to COMPRESS_CODECS
+        :type codecs: list[str] | None
+        :param level: Compression level
+        :type level: int
+        :param threaded: Compress output artifacts in a thread pool
+        :type threaded: bool
+        """
+        self.source = source
+        self.archive = archive
+        self.build_columns = build_columns
+        self.codecs = codecs
+        self.level = level
+        self.threaded = threaded
+        self.index = IndexBuilder() if build_index else None
+        self.validators: dict[str, str] = {}
+        self.uuids: dict[int, str] = {}
+        self.records: dict[int, dict[str, Any]] = {}
+        self.fingerprints: dict[int, tuple[int, int]] = {}
+        self.stats = DaemonStats(started=time())
+        self._stop = Event()
+        # set while converted records differ from the written files, so a
+        # failed write is retried on the next poll
+        self._pending = True
+        # start from the last published output, so an AnimeDoc that fails to
+        # convert on the first poll keeps its previous record and postings
+        try:
+            with open("anidb.json", "r") as f:
+                for info in json.load(f):
+                    media_id = int(info["mappings"]["anidb"])
+                    self.records[media_id] = info
+                    self.uuids[media_id] = info["uuid"]
+        except FileNotFoundError:
+            pass
+        if self.index is not None:
+            try:
+                with open("anidb_index.json", "r", encoding="utf-8") as f:
+                    self.index = IndexBuilder.from_dict(json.load(f))
+            except (FileNotFoundError, ValueError, KeyError):
+                pass
+            for media_id in self.index.media_ids:
+                if media_id not in self.records:
+                    self.index.discard(media_id)
+
+    def health(self) -> dict[str, Any]:
+        """
+        Get health and timing statistics
+        :return: Status ("starting", "ok", "degraded" if some AnimeDocs failed
+            to convert, or "failing"), uptime, and DaemonStats fields
+        :rtype: dict[str, Any]
+        """
+        if self.stats.polls == 0:
+            status = "starting"
+        elif self.stats.last_error is not None:
+            status = "failing"
+        elif self.stats.last_failed_docs:
+            status = "degraded"
+        else:
+            status = "ok"
+        return {
+            "status": status,
+            "uptime": time() - self.stats.started,
+            **asdict(self.stats),
+        }
+
+    def poll(self) -> bool:
+        """
+        Fetch the archive if it changed, then re-convert and write changed documents
+        :return: Whether the output files were rewritten
+        :rtype: bool
+        """
+        start = perf_counter()
+        self.stats.polls += 1
+        self.stats.last_poll = time()
+        try:
+            fetched = fetch_archive(self.source, self.archive, self.validators)
+            if fetched is None:
+                raise RuntimeError(f"Failed to fetch {self.source}")
+            changed, self.validators = fetched
+            if not changed and not self._pending:
+                self.stats.last_error = None
+                return False
+            convert_start = perf_counter()
+            changed_docs, removed_docs, failed_docs = self._convert()
+            self.stats.last_convert_seconds = perf_counter() - convert_start
+            self.stats.last_changed_docs = changed_docs
+            self.stats.last_removed_docs = removed_docs
+            self.stats.last_failed_docs = failed_docs
+            if not self._pending:
+                pprint.print(Status.INFO, "Archive changed, but no AnimeDoc did")
+                self.stats.last_error = None
+                return False
+            pprint.print(
+                Status.INFO,
+                f"Re-converted {changed_docs}, removed {removed_docs}, and failed {len(failed_docs)} AnimeDocs",
+            )
+            write_start = perf_counter()
+            new_info = [self.records[k] for k in sorted(self.records)]
+            write_outputs(
+                new_info,
+                self.index,
+                self.codecs,
+                self.level,
+                self.threaded,
+                self.build_columns,
+            )
+            self.stats.last_write_seconds = perf_counter() - write_start
+            self._pending = False
+            self.stats.last_error = None
+            self.stats.refreshes += 1
+            self.stats.last_refresh = time()
+            return True
+        except Exception as e:
+            self.stats.errors += 1
+            self.stats.last_error = str(e)
+            pprint.print(Status.ERR, f"An error occurred while polling: {e}")
+            return False
+        finally:
+            self.stats.records = len(self.records)
+            self.stats.last_poll_seconds = perf_counter() - start
+
+    def _convert(self) -> tuple[int, int, list[int]]:
+        """
+        Convert AnimeDocs whose fingerprint changed and drop the removed ones.
+        An AnimeDoc that fails to convert keeps its previous record and
+        fingerprint, so it is retried on the next change
+        :return: Number of converted and removed documents, and IDs of the
+            documents that failed to convert
+        :rtype: tuple[int, int, list[int]]
+        """
+        seen: set[int] = set()
+        changed = 0
+        failed: list[int] = []
+        with zipfile.ZipFile(self.archive, "r") as z:
+            for member in z.infolist():
+                match = _DOC_RE.search(member.filename)
+                if match is None:
+                    continue
+                media_id = int(match.group(1))
+                seen.add(media_id)
+                # CRC-32 and size come from the central directory, so unchanged
+                # documents are never decompressed
+                fingerprint = (member.CRC, member.file_size)
+                if self.fingerprints.get(media_id) == fingerprint:
+                    continue
+                try:
+                    xml = z.read(member).decode("utf-8")
+                    info = asdict(process_xml(xml, self.uuids.get(media_id), self.index))
+                except Exception as e:
+                    pprint.print(Status.FAIL, f"Failed to convert {member.filename}: {e!r}")
+                    failed.append(media_id)
+                    continue
+                self.records[media_id] = info
+                self.uuids[media_id] = info["uuid"]
+                self.fingerprints[media_id] = fingerprint
+                self._pending = True
+                changed += 1
+        removed = [k for k in self.records if k not in seen]
+        for media_id in removed:
+            del self.records[media_id]
+            self.fingerprints.pop(media_id, None)
+            if self.index is not None:
+                self.index.discard(media_id)
+            self._pending = True
+        return changed, len(removed), failed
+
+    def run(self, interval: float) -> None:
+        """
+        Poll on an interval until stop() is called
+        :param interval: Seconds between the start of two polls
+        :type interval: float
+        """
+        pprint.print(Status.INFO, f"Watching {self.source} every {interval} seconds")
+        while not self._stop.is_set():
+            start = perf_counter()
+            self.poll()
+            self._stop.wait(max(interval - (perf_counter() - start), 0))
+
+    def stop(self) -> None:
+        """Stop a running run() loop after the current poll"""
+        self._stop.set()
+
+    def serve_health(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve health() as JSON over HTTP in a background thread
+        :param port: Port to listen on, 0 to pick a free one
+        :type port: int
+        :param host: Host to listen on
+        :type host: str
+        :return: Running server, call shutdown() to stop it
+        :rtype: ThreadingHTTPServer
+        """
+        daemon = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                health = daemon.health()
+                body = json.dumps(health).encode("utf-8")
+                self.send_response(503 if health["status"] == "failing" else 200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_):
+                pass
+
+        server = ThreadingHTTPServer((host, port), HealthHandler)
+        Thread(target=server.serve_forever, daemon=True).start()
+        return server
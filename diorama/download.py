@@ -1,11 +1,18 @@
+import os
+import shutil
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
 import requests as req
 from fake_useragent import FakeUserAgent
 from alive_progress import alive_bar
 
 from consts import pprint, Status
 
+ARCHIVE_URL = 'https://files.shokoanime.com/files/shoko-server/other/Anime_HTTP.zip'
+
 def download_archive() -> bool:
-    url = 'https://files.shokoanime.com/files/shoko-server/other/Anime_HTTP.zip'
+    url = ARCHIVE_URL
     ua = FakeUserAgent().random
     headers = {'User-Agent': ua}
     try:
@@ -22,3 +29,95 @@ def download_archive() -> bool:
     except req.exceptions.RequestException as e:
         pprint.print(Status.FAIL, f'Failed to download Anime_HTTP.zip: {e}')
         return False
+
+def fetch_archive(
+    source: str = ARCHIVE_URL,
+    path: str = 'Anime_HTTP.zip',
+    validators: dict[str, str] | None = None,
+) -> tuple[bool, dict[str, str]] | None:
+    """
+    Fetch the archive only if it changed since the last fetch
+    :param source: HTTP(S) URL, file:// URL, or local path of the archive
+    :type source: str
+    :param path: Path to save the archive to
+    :type path: str
+    :param validators: Validators returned by the previous fetch, if any
+    :type validators: dict[str, str] | None
+    :return: Whether the archive changed and the validators to send next
+        time, or None if the fetch failed
+    :rtype: tuple[bool, dict[str, str]] | None
+    """
+    validators = validators or {}
+    scheme = urlparse(source).scheme
+    if scheme in ('http', 'https'):
+        return _fetch_http(source, path, validators)
+    local = url2pathname(urlparse(source).path) if scheme == 'file' else source
+    try:
+        st = os.stat(local)
+    except OSError as e:
+        pprint.print(Status.FAIL, f'Failed to read {local}: {e}')
+        return None
+    new_validators = {'mtime': str(st.st_mtime_ns), 'size': str(st.st_size)}
+    if new_validators == validators and os.path.exists(path):
+        return False, validators
+    if os.path.abspath(local) != os.path.abspath(path):
+        try:
+            shutil.copyfile(local, path + '.tmp')
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            _remove_tmp(path)
+            pprint.print(Status.FAIL, f'Failed to copy {local}: {e}')
+            return None
+    return True, new_validators
+
+def _fetch_http(
+    url: str,
+    path: str,
+    validators: dict[str, str],
+) -> tuple[bool, dict[str, str]] | None:
+    """
+    Fetch the archive over HTTP with a conditional request
+    :param url: URL of the archive
+    :type url: str
+    :param path: Path to save the archive to
+    :type path: str
+    :param validators: ETag and Last-Modified of the previous response, if any
+    :type validators: dict[str, str]
+    :return: Whether the archive changed and the new validators, or None if
+        the fetch failed
+    :rtype: tuple[bool, dict[str, str]] | None
+    """
+    headers = {'User-Agent': FakeUserAgent().random}
+    if os.path.exists(path):
+        if 'etag' in validators:
+            headers['If-None-Match'] = validators['etag']
+        if 'last-modified' in validators:
+            headers['If-Modified-Since'] = validators['last-modified']
+    try:
+        with req.get(url, headers=headers, stream=True, timeout=60) as r:
+            if r.status_code == 304:
+                return False, validators
+            r.raise_for_status()
+            with open(path + '.tmp', 'wb') as f:
+                for chunk in r.iter_content(chunk_size=65536):
+                    f.write(chunk)
+            os.replace(path + '.tmp', path)
+            new_validators = {
+                k.lower(): r.headers[k] for k in ('ETag', 'Last-Modified') if k in r.headers
+            }
+            return True, new_validators
+    except (req.exceptions.RequestException, OSError) as e:
+        _remove_tmp(path)
+        pprint.print(Status.FAIL, f'Failed to download {url}: {e}')
+        return None
+
+def _remove_tmp(path: str) -> None:
+    """
+    Remove a partially written archive, if any
+    :param path: Path the archive was being saved to
+    :type path: str
+    """
+    try:
+        os.remove(path + '.tmp')
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,307 @@
+"""Inverted tag and title index over AniDB IDs"""
+
+import json
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import Any, Iterable
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize text for index keys and lookups
+    :param text: Text to normalize
+    :type text: str
+    :return: NFKC-normalized, case-folded text
+    :rtype: str
+    """
+    return unicodedata.normalize("NFKC", text).casefold().strip()
+
+
+# Scripts written without spaces between words: kana, CJK ideographs, and hangul
+_CJK = "\u3040-\u30ff\u31f0-\u31ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_SEGMENT_RE = re.compile(f"[{_CJK}]+|[^{_CJK}]+")
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+
+def _segments(word: str) -> list[tuple[str, bool]]:
+    """
+    Split a word into runs of spaceless-script and other characters
+    :param word: Normalized word
+    :type word: str
+    :return: Runs, each with whether it is in a spaceless script
+    :rtype: list[tuple[str, bool]]
+    """
+    return [(run, bool(_CJK_RE.match(run))) for run in _SEGMENT_RE.findall(word)]
+
+
+def _ngrams(run: str) -> set[str]:
+    """
+    Get character unigrams and bigrams of a spaceless-script run
+    :param run: Run of spaceless-script characters
+    :type run: str
+    :return: Unigrams and bigrams
+    :rtype: set[str]
+    """
+    return set(run) | {run[i:i + 2] for i in range(len(run) - 1)}
+
+
+def tokenize(title: str) -> set[str]:
+    """
+    Split a title into normalized word tokens. Words containing kana, CJK
+    ideographs, or hangul also yield their character unigrams and bigrams,
+    as those scripts do not separate words with spaces
+    :param title: Title to split
+    :type title: str
+    :return: Unique tokens of the title
+    :rtype: set[str]
+    """
+    tokens: set[str] = set()
+    for word in re.findall(r"\w+", normalize(title)):
+        tokens.add(word)
+        segments = _segments(word)
+        if len(segments) == 1 and not segments[0][1]:
+            continue
+        for run, cjk in segments:
+            tokens.update(_ngrams(run) if cjk else {run})
+    return tokens
+
+
+def delta_encode(ids: Iterable[int]) -> list[int]:
+    """
+    Delta-encode IDs, first value is kept as is
+    :param ids: IDs to encode, sorted and deduplicated on the way
+    :type ids: Iterable[int]
+    :return: Delta-encoded IDs
+    :rtype: list[int]
+    """
+    final = []
+    prev = 0
+    for i in sorted(set(ids)):
+        final.append(i - prev)
+        prev = i
+    return final
+
+
+def delta_decode(deltas: Iterable[int]) -> list[int]:
+    """
+    Decode delta-encoded IDs
+    :param deltas: Delta-encoded IDs
+    :type deltas: Iterable[int]
+    :return: Sorted IDs
+    :rtype: list[int]
+    """
+    final = []
+    total = 0
+    for d in deltas:
+        total += d
+        final.append(total)
+    return final
+
+
+class IndexBuilder:
+    """Collect tag and title postings while records are converted"""
+
+    def __init__(self):
+        """IndexBuilder class constructor"""
+        self._tags: dict[str, set[int]] = {}
+        self._titles: dict[str, set[int]] = {}
+        self._keys: dict[int, tuple[set[str], set[str]]] = {}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "IndexBuilder":
+        """
+        Rebuild a builder from a serialized index
+        :param data: Index, as returned by IndexBuilder.to_dict
+        :type data: dict[str, Any]
+        :return: IndexBuilder object
+        :rtype: IndexBuilder
+        """
+        if data.get("version") != 1:
+            raise ValueError(f"Unsupported index version: {data.get('version')}")
+        builder = cls()
+        for field, postings, slot in (("tags", builder._tags, 0), ("titles", builder._titles, 1)):
+            for key, deltas in data[field].items():
+                ids = set(delta_decode(deltas))
+                postings[key] = ids
+                for media_id in ids:
+                    builder._keys.setdefault(media_id, (set(), set()))[slot].add(key)
+        return builder
+
+    @property
+    def media_ids(self) -> list[int]:
+        """
+        Get every indexed aniDB anime ID
+        :return: aniDB anime IDs
+        :rtype: list[int]
+        """
+        return list(self._keys)
+
+    def add(self, media_id: int, tags: Iterable[str], titles: Iterable[str]) -> None:
+        """
+        Add postings of a single anime, replacing the previous ones if any
+        :param media_id: aniDB anime ID
+        :type media_id: int
+        :param tags: aniDB anime tag names
+        :type tags: Iterable[str]
+        :param titles: aniDB anime titles
+        :type titles: Iterable[str]
+        """
+        self.discard(media_id)
+        tag_keys = {normalize(tag) for tag in tags}
+        title_keys = set().union(*(tokenize(title) for title in titles))
+        for key in tag_keys:
+            self._tags.setdefault(key, set()).add(media_id)
+        for key in title_keys:
+            self._titles.setdefault(key, set()).add(media_id)
+        self._keys[media_id] = (tag_keys, title_keys)
+
+    def discard(self, media_id: int) -> None:
+        """
+        Remove postings of a single anime, if any
+        :param media_id: aniDB anime ID
+        :type media_id: int
+        """
+        tag_keys, title_keys = self._keys.pop(media_id, ((), ()))
+        for postings, keys in ((self._tags, tag_keys), (self._titles, title_keys)):
+            for key in keys:
+                postings[key].discard(media_id)
+                if not postings[key]:
+                    del postings[key]
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Serialize the index with delta-encoded postings
+        :return: JSON-serializable index
+        :rtype: dict[str, Any]
+        """
+        return {
+            "version": 1,
+            "tags": {k: delta_encode(v) for k, v in sorted(self._tags.items())},
+            "titles": {k: delta_encode(v) for k, v in sorted(self._titles.items())},
+        }
+
+
+class InvertedIndex:
+    """Lookup API over a serialized index"""
+
+    def __init__(self, data: dict[str, Any]):
+        """
+        InvertedIndex class constructor
+        :param data: Index, as returned by IndexBuilder.to_dict
+        :type data: dict[str, Any]
+        """
+        if data.get("version") != 1:
+            raise ValueError(f"Unsupported index version: {data.get('version')}")
+        self._tags = {k: array("L", v) for k, v in data["tags"].items()}
+        self._titles = {k: array("L", v) for k, v in data["titles"].items()}
+        self._tokens = sorted(self._titles)
+
+    @classmethod
+    def load(cls, path: str) -> "InvertedIndex":
+        """
+        Load an index from a JSON file
+        :param path: Path to the index file
+        :type path: str
+        :return: InvertedIndex object
+        :rtype: InvertedIndex
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @property
+    def tag_names(self) -> list[str]:
+        """
+        Get every indexed tag name
+        :return: Normalized tag names
+        :rtype: list[str]
+        """
+        return list(self._tags)
+
+    def tagged(self, tag: str) -> list[int]:
+        """
+        Get anime tagged with a tag
+        :param tag: Tag name, matched case-insensitively
+        :type tag: str
+        :return: Sorted aniDB anime IDs
+        :rtype: list[int]
+        """
+        return delta_decode(self._tags.get(normalize(tag), ()))
+
+    def title_token(self, token: str) -> list[int]:
+        """
+        Get anime with a title containing an exact token
+        :param token: Title token
+        :type token: str
+        :return: Sorted aniDB anime IDs
+        :rtype: list[int]
+        """
+        return delta_decode(self._titles.get(normalize(token), ()))
+
+    def title_prefix(self, prefix: str) -> list[int]:
+        """
+        Get anime with a title token starting with a prefix
+        :param prefix: Token prefix
+        :type prefix: str
+        :return: Sorted aniDB anime IDs
+        :rtype: list[int]
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        ids: set[int] = set()
+        i = bisect_left(self._tokens, prefix)
+        while i < len(self._tokens) and self._tokens[i].startswith(prefix):
+            ids.update(delta_decode(self._titles[self._tokens[i]]))
+            i += 1
+        return sorted(ids)
+
+    def _match(self, word: str, prefix: bool) -> set[int]:
+        """
+        Get anime with a title matching a single normalized query word
+        :param word: Normalized query word
+        :type word: str
+        :param prefix: Match the end of the word as a prefix
+        :type prefix: bool
+        :return: aniDB anime IDs
+        :rtype: set[int]
+        """
+        segments = _segments(word)
+        if len(segments) == 1 and not segments[0][1]:
+            return set(self.title_prefix(word) if prefix else self.title_token(word))
+        # spaceless scripts match when every bigram of the run is present,
+        # which may over-match titles holding the bigrams apart
+        ids: set[int] | None = None
+        for i, (run, cjk) in enumerate(segments):
+            if cjk:
+                keys = {run} if len(run) == 1 else {run[j:j + 2] for j in range(len(run) - 1)}
+                postings = [set(self.title_token(key)) for key in keys]
+            elif prefix and i == len(segments) - 1:
+                postings = [set(self.title_prefix(run))]
+            else:
+                postings = [set(self.title_token(run))]
+            for found in postings:
+                ids = found if ids is None else ids & found
+                if not ids:
+                    return set()
+        return ids or set()
+
+    def search(self, query: str) -> list[int]:
+        """
+        Get anime whose titles match every word of a query, last word as prefix.
+        Words in kana, CJK ideographs, or hangul also match inside longer words
+        :param query: Search query
+        :type query: str
+        :return: Sorted aniDB anime IDs
+        :rtype: list[int]
+        """
+        words = re.findall(r"\w+", normalize(query))
+        if not words:
+            return []
+        ids = self._match(words[-1], prefix=True)
+        for word in words[:-1]:
+            if not ids:
+                break
+            ids &= self._match(word, prefix=False)
+        return sorted(ids)
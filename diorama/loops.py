@@ -7,21 +7,48 @@ import os
 import re
 from alive_progress import alive_bar
 from dataclasses import asdict
-from consts import pprint, Status
+from consts import pprint, Status, COMPRESS_CODECS, COMPRESS_LEVEL, COMPRESS_THREADED, BUILD_INDEX, BUILD_COLUMNS
+from compress import ArtifactStats, dump_many, report
+from columnar import write_columns
+from index import IndexBuilder
 from copy import deepcopy
 
-def process_file(file_path: str, data_uuid: str | None = None) -> MediaInfo:
+def process_file(
+    file_path: str,
+    data_uuid: str | None = None,
+    index: IndexBuilder | None = None,
+) -> MediaInfo:
     """
     Process a file
     :param file_path: Path to the file
     :type file_path: str
     :param data_uuid: UUID of the data, if any
     :type data_uuid: str | None
+    :param index: Index to add the tags and titles of the file to, if any
+    :type index: IndexBuilder | None
     :return: MediaInfo object
     :rtype: MediaInfo
     """
     with open(file_path, 'r') as f:
         xml = f.read()
+    return process_xml(xml, data_uuid, index)
+
+def process_xml(
+    xml: str,
+    data_uuid: str | None = None,
+    index: IndexBuilder | None = None,
+) -> MediaInfo:
+    """
+    Process an AnimeDoc XML string
+    :param xml: XML string
+    :type xml: str
+    :param data_uuid: UUID of the data, if any
+    :type data_uuid: str | None
+    :param index: Index to add the tags and titles of the document to, if any
+    :type index: IndexBuilder | None
+    :return: MediaInfo object
+    :rtype: MediaInfo
+    """
     picker = XMLPicker(xml)
     start_date = picker.start_date
     end_date = picker.end_date
@@ -76,11 +103,31 @@ def process_file(file_path: str, data_uuid: str | None = None) -> MediaInfo:
         ),
         source_data="anidb",
     )
+    # only index documents that converted without raising
+    if index is not None:
+        index.add(picker.media_id, picker.tags, picker.titles)
     return media_info
 
-def do_loop() -> list[MediaInfo]:
+def do_loop(
+    codecs: list[str] | None = None,
+    level: int = COMPRESS_LEVEL,
+    threaded: bool = COMPRESS_THREADED,
+    build_index: bool = BUILD_INDEX,
+    build_columns: bool = BUILD_COLUMNS,
+) -> list[MediaInfo]:
     """
     Looping all files in the Anime_HTTP/ directory
+    :param codecs: Codecs to compress the JSON artifacts with while writing,
+        defaults to COMPRESS_CODECS
+    :type codecs: list[str] | None
+    :param level: Compression level
+    :type level: int
+    :param threaded: Compress output artifacts in a thread pool
+    :type threaded: bool
+    :param build_index: Write the inverted tag and title index to anidb_index.json
+    :type build_index: bool
+    :param build_columns: Write numeric fields as NumPy columns to anidb.npz
+    :type build_columns: bool
     :return: List of MediaInfo objects
     :rtype: list[MediaInfo]
     """
@@ -91,6 +138,7 @@ def do_loop() -> list[MediaInfo]:
         old_info = []
     loi = len(old_info)
     new_info = []
+    index = IndexBuilder() if build_index else None
     with alive_bar(len(os.listdir("Anime_HTTP"))) as bar:
         for file in os.listdir("Anime_HTTP"):
             if not file.endswith(".xml"):
@@ -105,7 +153,7 @@ def do_loop() -> list[MediaInfo]:
                     if info['mappings']['anidb'] == media_id:
                         data_uuid = info['uuid']
                         break
-            new_info.append(process_file(file_path, data_uuid))
+            new_info.append(process_file(file_path, data_uuid, index))
             bar()
     # dump new info
     pprint.print(Status.INFO, "Completed loop, converting dataclasses to dict")
@@ -113,14 +161,53 @@ def do_loop() -> list[MediaInfo]:
     # sort by anidb id
     pprint.print(Status.INFO, "Sorting by AniDB ID")
     new_info.sort(key=lambda x: int(x['mappings']['anidb']))
-    pprint.print(Status.INFO, "Dumping to anidb.json")
-    with open("anidb.json", 'w') as f:
-        json.dump(new_info, f, ensure_ascii=False)
+    write_outputs(new_info, index, codecs, level, threaded, build_columns)
+    return new_info
+
+def write_outputs(
+    new_info: list[dict],
+    index: IndexBuilder | None = None,
+    codecs: list[str] | None = None,
+    level: int = COMPRESS_LEVEL,
+    threaded: bool = COMPRESS_THREADED,
+    build_columns: bool = BUILD_COLUMNS,
+) -> list[ArtifactStats]:
+    """
+    Write converted records to every output artifact, replacing each file atomically
+    :param new_info: MediaInfo objects converted to dict, sorted by AniDB ID
+    :type new_info: list[dict]
+    :param index: Index to write to anidb_index.json, if any
+    :type index: IndexBuilder | None
+    :param codecs: Codecs to compress the JSON artifacts with while writing,
+        defaults to COMPRESS_CODECS
+    :type codecs: list[str] | None
+    :param level: Compression level
+    :type level: int
+    :param threaded: Compress output artifacts in a thread pool
+    :type threaded: bool
+    :param build_columns: Write numeric fields as NumPy columns to anidb.npz
+    :type build_columns: bool
+    :return: Statistics of the written JSON artifacts
+    :rtype: list[ArtifactStats]
+    """
+    if codecs is None:
+        codecs = COMPRESS_CODECS
     # remove all keys that the value is either None, empty list, or empty dict, recursively
     pprint.print(Status.INFO, "Creating anidb_min.json")
     mininfo = deepcopy(new_info)
     mininfo = remove_empty_keys(mininfo)
-    pprint.print(Status.INFO, "Dumping to anidb_min.json")
-    with open("anidb_min.json", 'w') as f:
-        json.dump(mininfo, f, ensure_ascii=False)
-    return new_info
+    artifacts = {"anidb.json": new_info, "anidb_min.json": mininfo}
+    if index is not None:
+        artifacts["anidb_index.json"] = index.to_dict()
+    pprint.print(Status.INFO, f"Dumping to {', '.join(artifacts)}")
+    stats = dump_many(
+        artifacts,
+        codecs=codecs,
+        level=level,
+        threaded=threaded,
+    )
+    report(stats)
+    if build_columns:
+        pprint.print(Status.INFO, "Dumping to anidb.npz")
+        write_columns(new_info, "anidb.npz")
+    return stats
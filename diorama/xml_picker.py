@@ -268,6 +268,24 @@ class XMLPicker:
 
     transliterated_title = display_title
 
+    @property
+    def titles(self) -> list[str]:
+        """
+        Get every aniDB anime title, in any language and type
+        :return: aniDB anime titles
+        :rtype: list[str]
+        """
+        return [title.text for title in self.etree.findall("./titles/title") if title.text]
+
+    @property
+    def tags(self) -> list[str]:
+        """
+        Get aniDB anime tag names
+        :return: aniDB anime tag names
+        :rtype: list[str]
+        """
+        return [name.text for name in self.etree.findall(".//tag/name") if name.text]
+
     @property
     def synonyms(self) -> list[str]:
         """
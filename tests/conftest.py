@@ -0,0 +1,68 @@
+import functools
+import os
+import sys
+import zipfile
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+
+# modules in diorama/ import each other by bare name, as when run with `python diorama`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "diorama"))
+
+
+def anime_doc(media_id: int, title: str, episodes: int | None = 12) -> str:
+    """
+    Build a minimal AnimeDoc XML string
+    :param media_id: aniDB anime ID
+    :type media_id: int
+    :param title: Main title, also used for the English title
+    :type title: str
+    :param episodes: Episode count, None to leave <episodecount> out
+    :type episodes: int | None
+    :return: XML string
+    :rtype: str
+    """
+    count = "" if episodes is None else f"<episodecount>{episodes}</episodecount>"
+    return (
+        f'<anime id="{media_id}" restricted="false"><type>TV Series</type>{count}'
+        "<startdate>2001-04-03</startdate><enddate>2001-09-01</enddate>"
+        f'<titles><title xml:lang="x-jat" type="main">{title}</title>'
+        f'<title xml:lang="en" type="official">{title} EN</title></titles>'
+        '<tags><tag id="1"><name>Japanese production</name></tag></tags>'
+        '<resources><resource type="2"><externalentity>'
+        f"<identifier>{media_id * 10}</identifier></externalentity></resource></resources>"
+        "<episodes><episode><length>25</length></episode></episodes></anime>"
+    )
+
+
+@pytest.fixture
+def make_archive():
+    """Write an Anime_HTTP.zip-like archive from (id, title, episodes) tuples"""
+    def make(path: str, docs: list[tuple[int, str, int | None]]) -> str:
+        stat = os.stat(path) if os.path.exists(path) else None
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+            for media_id, title, episodes in docs:
+                z.writestr(f"Anime_HTTP/AnimeDoc_{media_id}.xml", anime_doc(media_id, title, episodes))
+        if stat is not None:
+            # make sure a rewrite is visible even on coarse mtime resolution
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        return path
+    return make
+
+
+@pytest.fixture
+def http_server(tmp_path):
+    """Serve tmp_path/www over HTTP, yielding the base URL"""
+    root = tmp_path / "www"
+    root.mkdir()
+
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, *_):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(root)))
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", root
+    server.shutdown()
+    server.server_close()
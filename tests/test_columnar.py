@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pytest
+
+import columnar
+
+from columnar import (
+    Columns,
+    build_columns,
+    episodes_per_year,
+    mapping_coverage,
+    minutes_per_season,
+    write_columns,
+)
+
+
+def record(anidb, start, unit_counts, subunit_counts, sub_type, season, **mappings):
+    return {
+        "mappings": {"anidb": anidb, **mappings},
+        "start_date": dict(zip(("year", "month", "day"), start)),
+        "end_date": {"year": None, "month": None, "day": None},
+        "unit_counts": unit_counts,
+        "subunit_counts": subunit_counts,
+        "subunit_order": None if unit_counts is None else 24,
+        "media_sub_type": sub_type,
+        "season": season,
+    }
+
+
+RECORDS = [
+    record(1, (1999, 1, None), 13, 300, "TV", "winter",
+           myanimelist=5, tmdb={"id": 30, "media_type": "tv"}, imdb={"id": "tt1"}),
+    record(2, (1999, 4, 2), None, 50, "OVA", None, tmdb={"id": 30, "media_type": "movie"}),
+    record(3, (None, None, None), 2, 50, None, "summer"),
+    record(4, (2001, 7, 2), 2, 50, "OVA", "summer", myanimelist=9),
+]
+
+
+@pytest.fixture
+def cols(tmp_path) -> Columns:
+    path = str(tmp_path / "anidb.npz")
+    write_columns(RECORDS, path)
+    return Columns.load(path)
+
+
+def test_masks(cols):
+    assert cols["anidb"].tolist() == [1, 2, 3, 4]
+    assert cols.mask("start_year").tolist() == [False, False, True, False]
+    assert cols.mask("start_day").tolist() == [True, False, True, False]
+    assert cols["unit_counts"].tolist() == [13, None, 2, 2]
+    assert cols.raw("unit_counts").dtype == np.int32
+    assert cols.mask("map_myanimelist").tolist() == [False, True, True, False]
+    assert cols.mask("anidb").tolist() == [False] * 4
+    assert cols["map_imdb"].tolist() == ["tt1", None, None, None]
+
+
+def test_categorical_round_trip(cols):
+    assert cols.is_categorical("season")
+    assert cols.decode("season").tolist() == ["winter", "", "summer", "summer"]
+    assert cols.decode("media_sub_type").tolist() == ["TV", "OVA", "", "OVA"]
+    assert cols.mask("season").tolist() == [False, True, False, False]
+    assert cols.raw("map_tmdb").tolist()[:2] == [30, 30]
+    assert cols.decode("map_tmdb_type").tolist() == ["tv", "movie", "", ""]
+    assert "map_myanimelist_type" not in cols.names
+
+
+def test_helpers(cols):
+    assert episodes_per_year(cols) == {1999: 13, 2001: 2}
+    assert minutes_per_season(cols) == {(1999, "winter"): 300, (2001, "summer"): 50}
+    coverage = mapping_coverage(cols)
+    assert coverage["myanimelist"] == 0.5
+    assert coverage["tmdb"] == 0.5
+    assert "tmdb_type" not in coverage
+
+
+def test_helpers_on_empty_input(tmp_path):
+    path = str(tmp_path / "anidb.npz")
+    write_columns([], path)
+    cols = Columns.load(path)
+    assert len(cols) == 0
+    assert episodes_per_year(cols) == {}
+    assert minutes_per_season(cols) == {}
+    assert all(v == 0.0 for v in mapping_coverage(cols).values())
+    assert cols.decode("season").tolist() == []
+
+
+def test_build_columns_dtypes():
+    columns = build_columns(RECORDS)
+    assert columns["start_year"].dtype == np.int16
+    assert columns["season"].dtype == np.int16
+    assert columns["map_imdb"].dtype.kind == "U"
+
+
+def test_failed_write_keeps_previous_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "anidb.npz")
+    write_columns(RECORDS[:1], path)
+
+    def broken(f, **_):
+        f.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(columnar.np, "savez_compressed", broken)
+    with pytest.raises(OSError):
+        write_columns(RECORDS, path)
+    assert os.listdir(tmp_path) == ["anidb.npz"]
+    assert len(Columns.load(path)) == 1
@@ -0,0 +1,82 @@
+import bz2
+import gzip
+import json
+import lzma
+import os
+
+import pytest
+
+from compress import CHUNK_SIZE, TeeWriter, dump_json, dump_many
+
+DATA = [{"id": i, "title": "星界の紋章" * (i % 7), "episodes": i} for i in range(2000)]
+OPENERS = {".gz": gzip.open, ".xz": lzma.open, ".bz2": bz2.open}
+
+
+@pytest.mark.parametrize("threaded", [False, True])
+def test_variants_match_plain_file(tmp_path, threaded):
+    paths = [str(tmp_path / "a.json"), str(tmp_path / "b.json")]
+    stats = dump_many(
+        {paths[0]: DATA, paths[1]: DATA[:10]},
+        codecs=["gzip", "lzma", "bz2"],
+        level=6,
+        threaded=threaded,
+    )
+    for path, artifact in zip(paths, stats):
+        with open(path, "rb") as f:
+            plain = f.read()
+        assert artifact.bytes_written == len(plain)
+        for ext, opener in OPENERS.items():
+            with opener(path + ext, "rb") as f:
+                assert f.read() == plain
+        for codec in artifact.codecs:
+            assert codec.bytes_in == len(plain)
+            assert codec.bytes_out == os.path.getsize(codec.path)
+    assert json.loads(open(paths[0], encoding="utf-8").read()) == DATA
+    assert not [p for p in os.listdir(tmp_path) if p.endswith(".tmp")]
+
+
+def test_disabled_codec_variant_is_removed(tmp_path):
+    path = str(tmp_path / "a.json")
+    dump_json(DATA, path, codecs=["gzip", "bz2"])
+    dump_json(DATA[:5], path, codecs=["gzip"])
+    assert os.path.exists(path + ".gz")
+    assert not os.path.exists(path + ".bz2")
+
+
+def test_unknown_codec(tmp_path):
+    with pytest.raises(ValueError):
+        TeeWriter(str(tmp_path / "a.json"), codecs=["zstd"])
+
+
+
+def test_abort_keeps_previous_files(tmp_path):
+    path = str(tmp_path / "a.json")
+    dump_json(DATA[:3], path, codecs=["gzip"])
+    with pytest.raises(RuntimeError):
+        with TeeWriter(path, codecs=["gzip"]) as f:
+            f.write(b"[" * 100000)
+            raise RuntimeError("interrupted")
+    assert json.load(open(path, encoding="utf-8")) == DATA[:3]
+    with gzip.open(path + ".gz") as f:
+        assert json.loads(f.read()) == DATA[:3]
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "a.json.gz"]
+
+
+@pytest.mark.parametrize("threaded", [False, True])
+def test_serializes_once_and_writes_large_slices(tmp_path, monkeypatch, threaded):
+    calls = []
+    write = TeeWriter.write
+    monkeypatch.setattr(TeeWriter, "write", lambda self, data, *a: calls.append(len(data)) or write(self, data, *a))
+    compress_calls = []
+    compress_slices = TeeWriter._compress
+    monkeypatch.setattr(
+        TeeWriter, "_compress",
+        staticmethod(lambda data, *a: compress_calls.append(len(data)) or compress_slices(data, *a)),
+    )
+    big = DATA * 40
+    path = str(tmp_path / "a.json")
+    dump_many({path: big, path + ".min": DATA}, codecs=["gzip", "lzma"], level=1, threaded=threaded)
+    # one write per artifact, not one per JSON token
+    assert calls == [os.path.getsize(path), os.path.getsize(path + ".min")]
+    assert calls[0] > 2 * CHUNK_SIZE
+    assert len(compress_calls) == 4
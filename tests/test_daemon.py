@@ -0,0 +1,100 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+import daemon as daemon_module
+from daemon import Daemon
+from index import InvertedIndex
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def make_daemon(source: str) -> Daemon:
+    return Daemon(source=source, archive="Anime_HTTP.zip", build_index=True, codecs=["gzip"], threaded=False)
+
+
+def test_poll_converts_only_changed_docs(workdir, make_archive, monkeypatch):
+    calls = []
+    process_xml = daemon_module.process_xml
+    monkeypatch.setattr(daemon_module, "process_xml", lambda xml, *a: calls.append(xml) or process_xml(xml, *a))
+    source = make_archive("src.zip", [(1, "Alpha", 12), (2, "Beta", 24)])
+    d = make_daemon(source)
+    assert d.poll() is True
+    assert len(calls) == 2
+    assert d.health()["status"] == "ok"
+
+    assert d.poll() is False
+    assert len(calls) == 2
+
+    make_archive(source, [(1, "Alpha", 12), (3, "Gamma", 5)])
+    assert d.poll() is True
+    assert len(calls) == 3
+    assert (d.stats.last_changed_docs, d.stats.last_removed_docs) == (1, 1)
+    with open("anidb.json") as f:
+        assert [r["mappings"]["anidb"] for r in json.load(f)] == [1, 3]
+    index = InvertedIndex.load("anidb_index.json")
+    assert index.search("beta") == []
+    assert index.search("gamma") == [3]
+
+
+def test_uuids_stable_across_restart(workdir, make_archive):
+    source = make_archive("src.zip", [(1, "Alpha", 12), (2, "Beta", 24)])
+    make_daemon(source).poll()
+    with open("anidb.json") as f:
+        before = {r["mappings"]["anidb"]: r["uuid"] for r in json.load(f)}
+    make_archive(source, [(1, "Alpha", 13), (2, "Beta", 24), (3, "Gamma", 5)])
+    assert make_daemon(source).poll() is True
+    with open("anidb.json") as f:
+        after = {r["mappings"]["anidb"]: r["uuid"] for r in json.load(f)}
+    assert after[1] == before[1] and after[2] == before[2]
+    assert after[3] not in before.values()
+
+
+def test_malformed_doc_keeps_previous_record(workdir, make_archive):
+    source = make_archive("src.zip", [(1, "Alpha", 12), (2, "Beta", 24)])
+    assert make_daemon(source).poll() is True
+    with open("anidb.json") as f:
+        published = {r["mappings"]["anidb"]: r for r in json.load(f)}
+
+    # restart with doc 2 missing its episode count, so it fails to convert
+    make_archive(source, [(1, "Alpha", 12), (2, "Broken", None), (3, "Gamma", 5)])
+    d = make_daemon(source)
+    assert d.poll() is True
+    assert d.stats.last_failed_docs == [2]
+    assert d.health()["status"] == "degraded"
+    with open("anidb.json") as f:
+        records = {r["mappings"]["anidb"]: r for r in json.load(f)}
+    assert sorted(records) == [1, 2, 3]
+    assert records[2] == published[2]
+    index = InvertedIndex.load("anidb_index.json")
+    assert index.search("beta") == [2]
+    assert index.search("broken") == []
+
+    make_archive(source, [(1, "Alpha", 12), (2, "Broken", 3), (3, "Gamma", 5)])
+    assert d.poll() is True
+    assert d.stats.last_failed_docs == []
+    assert d.records[2]["title_display"] == "Broken"
+    assert d.records[2]["uuid"] == published[2]["uuid"]
+
+
+def test_health_endpoint_fails_with_503(workdir):
+    d = make_daemon(str(workdir / "missing.zip"))
+    server = d.serve_health(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/"
+        with urllib.request.urlopen(url) as r:
+            assert json.load(r)["status"] == "starting"
+        assert d.poll() is False
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(url)
+        assert e.value.code == 503
+        assert json.load(e.value)["errors"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,74 @@
+import os
+import shutil
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+from download import fetch_archive
+
+
+def test_fetch_local_file(tmp_path, make_archive):
+    source = make_archive(str(tmp_path / "src.zip"), [(1, "Alpha", 12)])
+    target = str(tmp_path / "Anime_HTTP.zip")
+    changed, validators = fetch_archive(source, target)
+    assert changed
+    with open(source, "rb") as a, open(target, "rb") as b:
+        assert a.read() == b.read()
+    assert fetch_archive(source, target, validators) == (False, validators)
+    make_archive(source, [(1, "Alpha", 12), (2, "Beta", 24)])
+    changed, new_validators = fetch_archive("file://" + source, target, validators)
+    assert changed and new_validators != validators
+
+
+def test_fetch_missing_local_file(tmp_path):
+    assert fetch_archive(str(tmp_path / "missing.zip"), str(tmp_path / "a.zip")) is None
+
+
+def test_fetch_http_conditional(tmp_path, make_archive, http_server):
+    url, root = http_server
+    make_archive(str(root / "src.zip"), [(1, "Alpha", 12)])
+    target = str(tmp_path / "Anime_HTTP.zip")
+    changed, validators = fetch_archive(f"{url}/src.zip", target)
+    assert changed
+    assert "last-modified" in validators
+    assert os.path.getsize(target) == os.path.getsize(root / "src.zip")
+    assert fetch_archive(f"{url}/src.zip", target, validators) == (False, validators)
+    assert fetch_archive(f"{url}/missing.zip", target, validators) is None
+    assert not os.path.exists(target + ".tmp")
+
+
+def test_failed_local_copy_removes_tmp(tmp_path, make_archive, monkeypatch):
+    source = make_archive(str(tmp_path / "src.zip"), [(1, "Alpha", 12)])
+    target = str(tmp_path / "Anime_HTTP.zip")
+
+    def broken(src, dst):
+        with open(dst, "wb") as f:
+            f.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(shutil, "copyfile", broken)
+    assert fetch_archive(source, target) is None
+    assert sorted(os.listdir(tmp_path)) == ["src.zip"]
+
+
+def test_dropped_http_stream_removes_tmp(tmp_path):
+    class DroppingHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(1 << 20))
+            self.end_headers()
+            self.wfile.write(b"PK" * 1000)
+            self.wfile.flush()
+            self.close_connection = True
+
+        def log_message(self, *_):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DroppingHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        target = str(tmp_path / "Anime_HTTP.zip")
+        assert fetch_archive(f"http://127.0.0.1:{server.server_port}/src.zip", target) is None
+        assert os.listdir(tmp_path) == []
+    finally:
+        server.shutdown()
+        server.server_close()
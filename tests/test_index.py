@@ -0,0 +1,75 @@
+import pytest
+
+from index import IndexBuilder, InvertedIndex, delta_decode, delta_encode, tokenize
+
+
+@pytest.mark.parametrize("ids", [[], [5], [1, 2, 3], [3, 1, 2, 2], [7, 100000, 42]])
+def test_delta_round_trip(ids):
+    encoded = delta_encode(ids)
+    assert all(d >= 0 for d in encoded)
+    assert delta_decode(encoded) == sorted(set(ids))
+
+
+def test_tokenize_cjk_ngrams():
+    tokens = tokenize("機動戦士ガンダム SEED")
+    assert {"機動戦士ガンダム", "seed", "ガン", "ンダ", "ダム", "機"} <= tokens
+
+
+@pytest.fixture
+def index() -> InvertedIndex:
+    builder = IndexBuilder()
+    builder.add(1, ["Space", "Mecha"], ["Crest of the Stars", "星界の紋章"])
+    builder.add(3, ["mecha"], ["Mobile Suit Gundam", "機動戦士ガンダム"])
+    builder.add(2, ["Comedy"], ["Star Wars", "Broken"])
+    builder.add(2, ["space"], ["Star Wars"])
+    return InvertedIndex(builder.to_dict())
+
+
+def test_tagged(index):
+    assert index.tagged("MECHA") == [1, 3]
+    assert index.tagged("space") == [1, 2]
+    assert index.tagged("comedy") == []
+    assert sorted(index.tag_names) == ["mecha", "space"]
+
+
+def test_title_token_and_prefix(index):
+    assert index.title_token("Stars") == [1]
+    assert index.title_token("broken") == []
+    assert index.title_prefix("sta") == [1, 2]
+    assert index.title_prefix("gund") == [3]
+    assert index.title_prefix("") == []
+
+
+def test_search(index):
+    assert index.search("crest of the st") == [1]
+    assert index.search("mobile gun") == [3]
+    assert index.search("star") == [1, 2]
+    assert index.search("ガンダム") == [3]
+    assert index.search("紋") == [1]
+    assert index.search("ガンダム星") == []
+    assert index.search("   ") == []
+
+
+def test_discard():
+    builder = IndexBuilder()
+    builder.add(1, ["a"], ["x y"])
+    builder.add(2, ["a"], ["x"])
+    builder.discard(1)
+    builder.discard(9)
+    assert builder.to_dict() == {"version": 1, "tags": {"a": [2]}, "titles": {"x": [2]}}
+
+
+def test_builder_from_dict_round_trip():
+    builder = IndexBuilder()
+    builder.add(1, ["Space"], ["Crest of the Stars"])
+    builder.add(2, ["space"], ["Star Wars"])
+    restored = IndexBuilder.from_dict(builder.to_dict())
+    assert restored.to_dict() == builder.to_dict()
+    assert sorted(restored.media_ids) == [1, 2]
+    restored.discard(1)
+    assert restored.to_dict() == {"version": 1, "tags": {"space": [2]}, "titles": {"star": [2], "wars": [2]}}
+
+
+def test_unsupported_version():
+    with pytest.raises(ValueError):
+        InvertedIndex({"version": 2, "tags": {}, "titles": {}})